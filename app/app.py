@@ -87,9 +87,12 @@ async def search_advertisement(session: SessionDependency, page: int | None = No
                                size: int | None =  None, advertisement_id: int | None = None,
                                header: str | None = None, owner_id: int | None = None,
                                registration_time: datetime.datetime | None = None,
-                               description: str | None = None):
+                               description: str | None = None,
+                               registration_time_from: datetime.datetime | None = None,
+                               registration_time_to: datetime.datetime | None = None):
     search_result_list = await get_advertisement_filter(session, advertisement_id, header,
-                                                        owner_id, registration_time, description)
+                                                        owner_id, registration_time, description,
+                                                        registration_time_from, registration_time_to)
     if not search_result_list:
         raise HTTPException(status_code=404, detail=f'Advertisements not found!')
     len_search_result_list = len(search_result_list)
@@ -0,0 +1,31 @@
+import asyncio
+import argparse
+from models import engine
+from utils import detach_advertisement_partitions
+from config import ADVERTISEMENT_ARCHIVE_AFTER_MONTHS
+
+
+async def main(months_to_keep: int):
+    try:
+        detached = await detach_advertisement_partitions(months_to_keep)
+    finally:
+        await engine.dispose()
+    if detached:
+        print(f'ADVERTISEMENT PARTITIONS DETACHED: {", ".join(detached)}')
+    else:
+        print('NO ADVERTISEMENT PARTITIONS TO DETACH')
+
+
+def non_negative_int(value: str) -> int:
+    months = int(value)
+    if months < 0:
+        raise argparse.ArgumentTypeError(f'{value} is not a non-negative number of months')
+    return months
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Detach advertisement partitions older than the given '
+                                                 'number of months, detached partitions stay as plain tables')
+    parser.add_argument('--months', type=non_negative_int, default=ADVERTISEMENT_ARCHIVE_AFTER_MONTHS,
+                        help='number of full months (besides the current one) kept attached')
+    asyncio.run(main(parser.parse_args().months))
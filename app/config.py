@@ -17,6 +17,22 @@ HOST_LOCATION = os.getenv("HOST_LOCATION", default="127.0.0.1")
 PORT_LOCATION = int(os.getenv("PORT_LOCATION", default="9000"))
 DROP_ALL_TABLES = os.getenv("DROP_ALL_TABLES", default="Off")
 
+ADVERTISEMENT_PARTITIONS_AHEAD = int(os.getenv("ADVERTISEMENT_PARTITIONS_AHEAD", default="3"))
+ADVERTISEMENT_PARTITIONS_CHECK_INTERVAL = int(os.getenv("ADVERTISEMENT_PARTITIONS_CHECK_INTERVAL",
+                                                        default="86400"))
+ADVERTISEMENT_ARCHIVE_AFTER_MONTHS = int(os.getenv("ADVERTISEMENT_ARCHIVE_AFTER_MONTHS", default="12"))
+
+# At least the next month must exist in advance, otherwise inserts at the start of a month
+# can come before the periodic check creates its partition.
+if ADVERTISEMENT_PARTITIONS_AHEAD < 1:
+    raise ValueError(f'ADVERTISEMENT_PARTITIONS_AHEAD must be at least 1, got {ADVERTISEMENT_PARTITIONS_AHEAD}!')
+if ADVERTISEMENT_PARTITIONS_CHECK_INTERVAL < 1:
+    raise ValueError(f'ADVERTISEMENT_PARTITIONS_CHECK_INTERVAL must be at least 1, '
+                     f'got {ADVERTISEMENT_PARTITIONS_CHECK_INTERVAL}!')
+if ADVERTISEMENT_ARCHIVE_AFTER_MONTHS < 0:
+    raise ValueError(f'ADVERTISEMENT_ARCHIVE_AFTER_MONTHS must not be negative, '
+                     f'got {ADVERTISEMENT_ARCHIVE_AFTER_MONTHS}!')
+
 PG_DSN = (f'postgresql{POSTGRES_DRIVER}://{POSTGRES_USER}:{POSTGRES_PASSWORD}@'
           f'{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}')
 
@@ -1,7 +1,7 @@
 import datetime
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from models import ORM_OBJECT, User, Advertisement
+from sqlalchemy import select, func
+from models import ORM_OBJECT, User, Advertisement, ADVERTISEMENT_HEADER_LOCK
 from sqlalchemy.exc import IntegrityError
 from fastapi import HTTPException
 
@@ -18,6 +18,19 @@ async def add_user_to_db(session: AsyncSession, user_obj: ORM_OBJECT) -> ORM_OBJ
 
 
 async def add_advertisement_to_db(session: AsyncSession, advertisement_obj: ORM_OBJECT) -> ORM_OBJECT:
+    # The partitioned table cannot hold a unique constraint on header alone, so header uniqueness is
+    # enforced only here, under a transaction-level advisory lock on the header released by commit/rollback.
+    # Advertisements in archived (detached) partitions are not checked, their headers may be reused.
+    header_select = select(Advertisement.id).where(Advertisement.header == advertisement_obj.header)
+    if advertisement_obj.id is not None:
+        header_select = header_select.where(Advertisement.id != advertisement_obj.id)
+    with session.no_autoflush:
+        await session.execute(select(func.pg_advisory_xact_lock(ADVERTISEMENT_HEADER_LOCK,
+                                                            func.hashtext(advertisement_obj.header))))
+        header_exists = (await session.execute(header_select.limit(1))).scalar_one_or_none() is not None
+    if header_exists:
+        await session.rollback()
+        raise HTTPException(status_code=409, detail=f'Advertisement [{advertisement_obj.header}] already exists!')
     session.add(advertisement_obj)
     try:
         await session.commit()
@@ -26,8 +39,10 @@ async def add_advertisement_to_db(session: AsyncSession, advertisement_obj: ORM_
             raise HTTPException(status_code=404,
                                 detail=f"Advertisement [{advertisement_obj.header}]: Owner [id: "
                                        f"{advertisement_obj.owner_id}] not found in user's table!")
-        if err.orig.pgcode == "23505":
-            raise HTTPException(status_code=409, detail=f'Advertisement [{advertisement_obj.header}] already exists!')
+        if err.orig.pgcode == "23514":
+            raise HTTPException(status_code=503,
+                                detail=f"Advertisement [{advertisement_obj.header}]: no partition of "
+                                       f"advertisement's table for the registration time, try again later!")
         raise err
     return advertisement_obj
 
@@ -40,7 +55,8 @@ async def get_user_by_id(session: AsyncSession, user_id: int) -> ORM_OBJECT:
 
 
 async def get_advertisement_by_id(session: AsyncSession, advertisement_id: int) -> ORM_OBJECT:
-    advertisement_obj = await session.get(Advertisement, advertisement_id)
+    advertisement_obj = (await session.execute(
+        select(Advertisement).where(Advertisement.id == advertisement_id))).scalar_one_or_none()
     if advertisement_obj is None:
         raise HTTPException(status_code=404, detail=f'Advertisement [id: {advertisement_id}] not found!')
     return advertisement_obj
@@ -92,150 +108,23 @@ async def get_user_filter(session: AsyncSession, user_id: int | None = None, nam
 async def get_advertisement_filter(session: AsyncSession, advertisement_id: int | None = None,
                                    header: str | None = None, owner_id: int | None = None,
                                    time: datetime.datetime | None = None,
-                                   description: str | None = None) -> list[ORM_OBJECT]:
-    if (advertisement_id is not None and header is None and owner_id is None
-        and time is None and description is None):
-        obj_select = select(Advertisement).where(Advertisement.id == advertisement_id)
-    if (advertisement_id is not None and header is None and owner_id is None
-        and time is None and description is not None):
-        obj_select = select(Advertisement).where((Advertisement.id == advertisement_id) &
-                                                 (Advertisement.description == description))
-    if (advertisement_id is not None and header is None and owner_id is None
-        and time is not None and description is None):
-        obj_select = select(Advertisement).where((Advertisement.id == advertisement_id) &
-                                                 (Advertisement.registration_time == time))
-    if (advertisement_id is not None and header is None and owner_id is None
-        and time is not None and description is not None):
-        obj_select = select(Advertisement).filter((Advertisement.id == advertisement_id) &
-                                                  (Advertisement.registration_time == time) &
-                                                  (Advertisement.description == description))
-    if (advertisement_id is None and header is None and owner_id is None and time is None
-        and description is None):
-        obj_select = select(Advertisement)
-    if (advertisement_id is None and header is None and owner_id is None and time is None
-        and description is not None):
-        obj_select = select(Advertisement).where(Advertisement.description == description)
-    if (advertisement_id is None and header is None and owner_id is None and time is not None
-        and description is None):
-        obj_select = select(Advertisement).where(Advertisement.registration_time == time)
-    if (advertisement_id is None and header is None and owner_id is None and time is not None
-        and description is not None):
-        obj_select = select(Advertisement).where((Advertisement.registration_time == time) &
-                                                 (Advertisement.description == description))
-    if (advertisement_id is None and header is None and owner_id is not None and time is None
-        and description is None):
-        obj_select = select(Advertisement).where(Advertisement.owner_id == owner_id)
-    if (advertisement_id is None and header is None and owner_id is not None and time is None
-        and description is not None):
-        obj_select = select(Advertisement).where((Advertisement.owner_id == owner_id) &
-                                                 (Advertisement.description == description))
-    if (advertisement_id is None and header is None and owner_id is not None and time is not None
-        and description is None):
-        obj_select = select(Advertisement).where((Advertisement.owner_id == owner_id) &
-                                                 (Advertisement.registration_time == time))
-    if (advertisement_id is None and header is None and owner_id is not None and time is not None
-        and description is not None):
-        obj_select = select(Advertisement).where((Advertisement.owner_id == owner_id) &
-                                                 (Advertisement.registration_time == time) &
-                                                 (Advertisement.description == description))
-    if (advertisement_id is None and header is not None and owner_id is None and time is None
-        and description is None):
-        obj_select = select(Advertisement).where(Advertisement.header == header)
-    if (advertisement_id is None and header is not None and owner_id is None and time is None
-        and description is not None):
-        obj_select = select(Advertisement).where((Advertisement.header == header) &
-                                                 (Advertisement.description == description))
-    if (advertisement_id is None and header is not None and owner_id is None and time is not None
-        and description is None):
-        obj_select = select(Advertisement).where((Advertisement.header == header) &
-                                                 (Advertisement.registration_time == time))
-    if (advertisement_id is None and header is not None and owner_id is None and time is not None
-        and description is not None):
-        obj_select = select(Advertisement).where((Advertisement.header == header) &
-                                                 (Advertisement.registration_time == time) &
-                                                 (Advertisement.description == description))
-    if (advertisement_id is None and header is not None and owner_id is not None and time is None
-        and description is None):
-        obj_select = select(Advertisement).where((Advertisement.header == header) &
-                                                 (Advertisement.owner_id == owner_id))
-    if (advertisement_id is None and header is not None and owner_id is not None and time is None
-        and description is not None):
-        obj_select = select(Advertisement).where((Advertisement.header == header) &
-                                                 (Advertisement.owner_id == owner_id) &
-                                                 (Advertisement.description == description))
-    if (advertisement_id is None and header is not None and owner_id is not None and time is not None
-        and description is None):
-        obj_select = select(Advertisement).where((Advertisement.header == header) &
-                                                 (Advertisement.owner_id == owner_id) &
-                                                 (Advertisement.registration_time == time))
-    if (advertisement_id is None and header is not None and owner_id is not None and time is not None
-        and description is not None):
-        obj_select = select(Advertisement).where((Advertisement.header == header) &
-                                                 (Advertisement.owner_id == owner_id) &
-                                                 (Advertisement.registration_time == time) &
-                                                 (Advertisement.description == description))
-    if (advertisement_id is not None and header is None and owner_id is not None and time is None
-        and description is None):
-        obj_select = select(Advertisement).where((Advertisement.id == advertisement_id) &
-                                                 (Advertisement.owner_id == owner_id))
-    if (advertisement_id is not None and header is None and owner_id is not None and time is None
-        and description is not None):
-        obj_select = select(Advertisement).where((Advertisement.id == advertisement_id) &
-                                                 (Advertisement.owner_id == owner_id) &
-                                                 (Advertisement.description == description))
-    if (advertisement_id is not None and header is None and owner_id is not None and time is not None
-        and description is None):
-        obj_select = select(Advertisement).where((Advertisement.id == advertisement_id) &
-                                                 (Advertisement.owner_id == owner_id) &
-                                                 (Advertisement.registration_time == time))
-    if (advertisement_id is not None and header is None and owner_id is not None and time is not None
-        and description is not None):
-        obj_select = select(Advertisement).where((Advertisement.id == advertisement_id) &
-                                                 (Advertisement.owner_id == owner_id) &
-                                                 (Advertisement.registration_time == time) &
-                                                 (Advertisement.description == description))
-    if (advertisement_id is not None and header is not None and owner_id is None and time is None
-        and description is None):
-        obj_select = select(Advertisement).where((Advertisement.id == advertisement_id) &
-                                                 (Advertisement.header == header))
-    if (advertisement_id is not None and header is not None and owner_id is None and time is None
-        and description is not None):
-        obj_select = select(Advertisement).where((Advertisement.id == advertisement_id) &
-                                                 (Advertisement.header == header) &
-                                                 (Advertisement.description == description))
-    if (advertisement_id is not None and header is not None and owner_id is None and time is not None
-        and description is None):
-        obj_select = select(Advertisement).where((Advertisement.id == advertisement_id) &
-                                                 (Advertisement.header == header) &
-                                                 (Advertisement.registration_time == time))
-    if (advertisement_id is not None and header is not None and owner_id is None and time is not None
-        and description is not None):
-        obj_select = select(Advertisement).where((Advertisement.id == advertisement_id) &
-                                                 (Advertisement.header == header) &
-                                                 (Advertisement.registration_time == time) &
-                                                 (Advertisement.description == description))
-    if (advertisement_id is not None and header is not None and owner_id is not None and time is None
-        and description is None):
-        obj_select = select(Advertisement).where((Advertisement.id == advertisement_id) &
-                                                 (Advertisement.header == header) &
-                                                 (Advertisement.owner_id == owner_id))
-    if (advertisement_id is not None and header is not None and owner_id is not None and time is None
-        and description is not None):
-        obj_select = select(Advertisement).where((Advertisement.id == advertisement_id) &
-                                                 (Advertisement.header == header) &
-                                                 (Advertisement.owner_id == owner_id) &
-                                                 (Advertisement.description == description))
-    if (advertisement_id is not None and header is not None and owner_id is not None and time is not None
-        and description is None):
-        obj_select = select(Advertisement).where((Advertisement.id == advertisement_id) &
-                                                 (Advertisement.header == header) &
-                                                 (Advertisement.owner_id == owner_id) &
-                                                 (Advertisement.registration_time == time))
-    if (advertisement_id is not None and header is not None and owner_id is not None and time is not None
-        and description is not None):
-        obj_select = select(Advertisement).where((Advertisement.id == advertisement_id) &
-                                                 (Advertisement.header == header) &
-                                                 (Advertisement.owner_id == owner_id) &
-                                                 (Advertisement.registration_time == time) &
-                                                 (Advertisement.description == description))
+                                   description: str | None = None,
+                                   time_from: datetime.datetime | None = None,
+                                   time_to: datetime.datetime | None = None) -> list[ORM_OBJECT]:
+    obj_select = select(Advertisement)
+    if advertisement_id is not None:
+        obj_select = obj_select.where(Advertisement.id == advertisement_id)
+    if header is not None:
+        obj_select = obj_select.where(Advertisement.header == header)
+    if owner_id is not None:
+        obj_select = obj_select.where(Advertisement.owner_id == owner_id)
+    # Conditions on registration_time let PostgreSQL prune the monthly partitions outside the range.
+    if time is not None:
+        obj_select = obj_select.where(Advertisement.registration_time == time)
+    if time_from is not None:
+        obj_select = obj_select.where(Advertisement.registration_time >= time_from)
+    if time_to is not None:
+        obj_select = obj_select.where(Advertisement.registration_time < time_to)
+    if description is not None:
+        obj_select = obj_select.where(Advertisement.description == description)
     return [user_obj.json for user_obj in (await session.execute(obj_select)).scalars().all()]
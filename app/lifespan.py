@@ -1,8 +1,23 @@
-from contextlib import asynccontextmanager
+import asyncio
+from contextlib import asynccontextmanager, suppress
 from fastapi import FastAPI
 from models import engine
-from utils import create_tables, delete_tables
-from config import DROP_ALL_TABLES
+from utils import (create_tables, delete_tables, create_advertisement_partitions,
+                   convert_advertisement_to_partitioned)
+from config import (DROP_ALL_TABLES, ADVERTISEMENT_PARTITIONS_AHEAD,
+                    ADVERTISEMENT_PARTITIONS_CHECK_INTERVAL)
+
+
+async def create_advertisement_partitions_periodically():
+    while True:
+        await asyncio.sleep(ADVERTISEMENT_PARTITIONS_CHECK_INTERVAL)
+        try:
+            created = await create_advertisement_partitions(ADVERTISEMENT_PARTITIONS_AHEAD)
+        except Exception as err:
+            print(f'ADVERTISEMENT PARTITIONS NOT CREATED: {err}')
+            continue
+        if created:
+            print(f'ADVERTISEMENT PARTITIONS CREATED: {", ".join(created)}')
 
 
 @asynccontextmanager
@@ -11,8 +26,15 @@ async def lifespan(app: FastAPI):
         await delete_tables()
         print('DATABASE INITIALIZED')
     await create_tables()
+    if await convert_advertisement_to_partitioned(ADVERTISEMENT_PARTITIONS_AHEAD):
+        print('ADVERTISEMENT TABLE CONVERTED TO PARTITIONED')
+    await create_advertisement_partitions(ADVERTISEMENT_PARTITIONS_AHEAD)
     print('DATABASE READY')
+    partitions_task = asyncio.create_task(create_advertisement_partitions_periodically())
     print('START')
     yield
+    partitions_task.cancel()
+    with suppress(asyncio.CancelledError):
+        await partitions_task
     await engine.dispose()
     print('FINISH')
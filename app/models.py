@@ -4,7 +4,7 @@ from sqlalchemy.ext.asyncio import (create_async_engine,
                                     async_sessionmaker,
                                     AsyncAttrs)
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
-from sqlalchemy import Integer, String, DateTime, func, ForeignKey
+from sqlalchemy import Integer, String, DateTime, func, ForeignKey, PrimaryKeyConstraint
 
 
 engine = create_async_engine(PG_DSN)
@@ -34,11 +34,19 @@ class User(Base):
 
 class Advertisement(Base):
     __tablename__ = 'advertisement'
+    # Monthly range partitions on registration_time (see utils.create_advertisement_partitions).
+    # PostgreSQL requires the partition key in every unique constraint, so the primary key
+    # is (id, registration_time) and header uniqueness is enforced in crud.add_advertisement_to_db.
+    __table_args__ = (
+        PrimaryKeyConstraint('id', 'registration_time'),
+        {'postgresql_partition_by': 'RANGE (registration_time)'},
+    )
 
-    id: Mapped[int] = mapped_column(Integer, primary_key=True)
-    header: Mapped[str] = mapped_column(String(120), unique=True, nullable=False)
+    id: Mapped[int] = mapped_column(Integer, autoincrement=True)
+    header: Mapped[str] = mapped_column(String(120), index=True, nullable=False)
     owner_id: Mapped[int] = mapped_column(ForeignKey(User.id), index=True)
-    registration_time: Mapped[datetime.datetime] = mapped_column(DateTime, server_default=func.now())
+    registration_time: Mapped[datetime.datetime] = mapped_column(DateTime, server_default=func.now(),
+                                                                 nullable=False)
     description: Mapped[str] = mapped_column(String(240), nullable=False)
 
     @property
@@ -52,5 +60,10 @@ class Advertisement(Base):
         }
 
 
+# Class ids of the two-key pg_advisory_xact_lock, so header and partition locks never share a key.
+ADVERTISEMENT_HEADER_LOCK = 1
+ADVERTISEMENT_PARTITIONS_LOCK = 2
+
+
 ORM_OBJECT = User | Advertisement
 ORM_CLS = type[User | Advertisement]
\ No newline at end of file
@@ -1,5 +1,9 @@
+import datetime
+import re
 from passlib.context import CryptContext
-from models import Base, engine
+from models import Base, Advertisement, ADVERTISEMENT_PARTITIONS_LOCK, engine
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
 from math import ceil
 
 
@@ -24,6 +28,148 @@ async def delete_tables():
         await conn.run_sync(Base.metadata.drop_all)
 
 
+ADVERTISEMENT_PARTITION_PATTERN = re.compile(rf'^{Advertisement.__tablename__}_y(\d{{4}})m(\d{{2}})$')
+
+
+def shift_month(month_start: datetime.datetime, months: int) -> datetime.datetime:
+    month_index = month_start.year * 12 + month_start.month - 1 + months
+    return datetime.datetime(month_index // 12, month_index % 12 + 1, 1)
+
+
+def get_advertisement_partition_name(month_start: datetime.datetime) -> str:
+    return f'{Advertisement.__tablename__}_y{month_start:%Y}m{month_start:%m}'
+
+
+async def get_current_month_start(conn: AsyncConnection) -> datetime.datetime:
+    # registration_time is filled by the database (server_default now()), so the month
+    # boundaries are taken from the database clock rather than from the application host.
+    return (await conn.execute(text("SELECT date_trunc('month', localtimestamp)"))).scalar_one()
+
+
+async def get_advertisement_relkind(conn: AsyncConnection) -> str | None:
+    return (await conn.execute(text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:table_name)"),
+                               {'table_name': Advertisement.__tablename__})).scalar_one_or_none()
+
+
+async def check_advertisement_partitioned(conn: AsyncConnection):
+    if await get_advertisement_relkind(conn) != 'p':
+        raise RuntimeError(f'Table [{Advertisement.__tablename__}] is not partitioned, '
+                           f'start the application to convert it!')
+
+
+async def get_advertisement_partition_names(conn: AsyncConnection) -> list[str]:
+    return list((await conn.execute(text("SELECT c.relname FROM pg_inherits i "
+                                         "JOIN pg_class c ON c.oid = i.inhrelid "
+                                         "WHERE i.inhparent = to_regclass(:table_name) "
+                                         "ORDER BY c.relname"),
+                                    {'table_name': Advertisement.__tablename__})).scalars().all())
+
+
+async def lock_advertisement_partitions(conn: AsyncConnection):
+    # Startup conversion, the periodic task, archiving and other application instances all change
+    # the partitions of the same table, the advisory lock serialises them until commit.
+    await conn.execute(text("SELECT pg_advisory_xact_lock(:lock_class, hashtext(:table_name))"),
+                       {'lock_class': ADVERTISEMENT_PARTITIONS_LOCK, 'table_name': Advertisement.__tablename__})
+
+
+async def create_advertisement_partitions_between(conn: AsyncConnection, first_month_start: datetime.datetime,
+                                                  last_month_start: datetime.datetime) -> list[str]:
+    # IF NOT EXISTS makes a repeat by a process that waited for the lock harmless.
+    await lock_advertisement_partitions(conn)
+    partition_names_before = set(await get_advertisement_partition_names(conn))
+    expected_partition_names = set()
+    month_start = first_month_start
+    while month_start <= last_month_start:
+        partition_name = get_advertisement_partition_name(month_start)
+        await conn.execute(text(f"CREATE TABLE IF NOT EXISTS {partition_name} "
+                                f"PARTITION OF {Advertisement.__tablename__} "
+                                f"FOR VALUES FROM ('{month_start.isoformat()}') "
+                                f"TO ('{shift_month(month_start, 1).isoformat()}')"))
+        expected_partition_names.add(partition_name)
+        month_start = shift_month(month_start, 1)
+    partition_names_after = set(await get_advertisement_partition_names(conn))
+    # IF NOT EXISTS also skips a name taken by a table that is not a partition, e.g. an archived one.
+    missing_partition_names = expected_partition_names - partition_names_after
+    if missing_partition_names:
+        raise RuntimeError(f'Partitions [{", ".join(sorted(missing_partition_names))}] of table '
+                           f'[{Advertisement.__tablename__}] not created, tables with these names '
+                           f'already exist and are not attached to it!')
+    return sorted(partition_names_after - partition_names_before)
+
+
+async def create_advertisement_partitions(months_ahead: int) -> list[str]:
+    async with engine.begin() as conn:
+        await lock_advertisement_partitions(conn)
+        await check_advertisement_partitioned(conn)
+        current_month_start = await get_current_month_start(conn)
+        return await create_advertisement_partitions_between(conn, current_month_start,
+                                                             shift_month(current_month_start, months_ahead))
+
+
+async def convert_advertisement_to_partitioned(months_ahead: int) -> bool:
+    # One-time conversion of a table created before partitioning: the rows are copied into a new
+    # partitioned table in a single transaction, so a failure leaves the old table untouched.
+    async with engine.begin() as conn:
+        # relkind is read under the lock, so a process that waited for another one's conversion sees 'p'.
+        await lock_advertisement_partitions(conn)
+        if await get_advertisement_relkind(conn) != 'r':
+            return False
+        old_table_name = f'{Advertisement.__tablename__}_unpartitioned'
+        await conn.execute(text(f"ALTER TABLE {Advertisement.__tablename__} RENAME TO {old_table_name}"))
+        index_names = (await conn.execute(text("SELECT c.relname FROM pg_index i "
+                                               "JOIN pg_class c ON c.oid = i.indexrelid "
+                                               "WHERE i.indrelid = to_regclass(:table_name)"),
+                                          {'table_name': old_table_name})).scalars().all()
+        for index_name in index_names:
+            await conn.execute(text(f'ALTER INDEX "{index_name}" RENAME TO "{index_name}_unpartitioned"'))
+        await conn.run_sync(Base.metadata.create_all, tables=[Advertisement.__table__])
+        current_month_start = await get_current_month_start(conn)
+        first_month_start, last_month_start = (await conn.execute(text(
+            f"SELECT date_trunc('month', min(registration_time)), date_trunc('month', max(registration_time)) "
+            f"FROM {old_table_name}"))).one()
+        first_month_start = min(first_month_start or current_month_start, current_month_start)
+        last_month_start = max(last_month_start or current_month_start, shift_month(current_month_start, months_ahead))
+        await create_advertisement_partitions_between(conn, first_month_start, last_month_start)
+        await conn.execute(text(f"INSERT INTO {Advertisement.__tablename__} "
+                                f"(id, header, owner_id, registration_time, description) "
+                                f"SELECT id, header, owner_id, COALESCE(registration_time, localtimestamp), "
+                                f"description FROM {old_table_name}"))
+        await conn.execute(text(f"SELECT setval(pg_get_serial_sequence(:table_name, 'id'), "
+                                f"COALESCE(max(id), 0) + 1, false) FROM {Advertisement.__tablename__}"),
+                           {'table_name': Advertisement.__tablename__})
+        await conn.execute(text(f"DROP TABLE {old_table_name}"))
+    return True
+
+
+async def detach_advertisement_partitions(months_to_keep: int) -> list[str]:
+    detached = []
+    async with engine.begin() as conn:
+        await lock_advertisement_partitions(conn)
+        await check_advertisement_partitioned(conn)
+        current_month_start = await get_current_month_start(conn)
+        # The current month always stays attached, otherwise new advertisements have no partition.
+        archive_before = min(shift_month(current_month_start, -months_to_keep), current_month_start)
+        for partition_name in await get_advertisement_partition_names(conn):
+            match = ADVERTISEMENT_PARTITION_PATTERN.match(partition_name)
+            if match is None:
+                continue
+            month_start = datetime.datetime(int(match.group(1)), int(match.group(2)), 1)
+            if shift_month(month_start, 1) > archive_before:
+                continue
+            await conn.execute(text(f"ALTER TABLE {Advertisement.__tablename__} "
+                                    f"DETACH PARTITION {partition_name}"))
+            # DETACH turns the inherited owner_id foreign key into a constraint of the archived
+            # table, which would block deleting users and dropping the user table.
+            foreign_keys = (await conn.execute(text("SELECT conname FROM pg_constraint "
+                                                    "WHERE conrelid = to_regclass(:partition_name) "
+                                                    "AND contype = 'f'"),
+                                               {'partition_name': partition_name})).scalars().all()
+            for foreign_key in foreign_keys:
+                await conn.execute(text(f'ALTER TABLE {partition_name} DROP CONSTRAINT "{foreign_key}"'))
+            detached.append(partition_name)
+    return detached
+
+
 def validate_and_set_paginate_params(len_search: int, page: int | None = None,
                                      size: int | None = None) -> tuple[int, int]:
     if size is None or size not in range(1, len_search+1):